@@ -3,381 +3,508 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
+import sys
+import errno
+import signal
+import tempfile
+import time
 import sqlite3
 import subprocess
 import json
-from datetime import datetime
+import csv
+import shutil
+import hashlib
+import struct
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta, timezone as dt_timezone
 from pathlib import Path
 import threading
 
-class PhotoExtractGUI:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Photos Library Extractor")
-        self.root.geometry("600x650")
-        
-        # Variables
-        self.library_path = tk.StringVar()
-        self.destination_path = tk.StringVar()
-        self.folder_structure = tk.StringVar(value="year_month")
-        self.filename_format = tk.StringVar(value="date_original")
-        self.include_xmp = tk.BooleanVar(value=True)
-        self.include_keywords = tk.BooleanVar(value=True)
-        self.include_person_tags = tk.BooleanVar(value=True)
-        
-        self.create_widgets()
-        
-    def create_widgets(self):
-        # Main frame
-        main_frame = ttk.Frame(self.root, padding="10")
-        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        
-        # Configure grid weights
-        self.root.columnconfigure(0, weight=1)
-        self.root.rowconfigure(0, weight=1)
-        main_frame.columnconfigure(1, weight=1)
-        
-        row = 0
-        
-        # Library selection
-        ttk.Label(main_frame, text="Photos Library:").grid(row=row, column=0, sticky=tk.W, pady=(0, 5))
-        ttk.Entry(main_frame, textvariable=self.library_path, width=50).grid(row=row, column=1, sticky=(tk.W, tk.E), padx=(10, 5), pady=(0, 5))
-        ttk.Button(main_frame, text="Browse", command=self.browse_library).grid(row=row, column=2, pady=(0, 5))
-        row += 1
-        
-        # Destination selection
-        ttk.Label(main_frame, text="Destination:").grid(row=row, column=0, sticky=tk.W, pady=(0, 5))
-        ttk.Entry(main_frame, textvariable=self.destination_path, width=50).grid(row=row, column=1, sticky=(tk.W, tk.E), padx=(10, 5), pady=(0, 5))
-        ttk.Button(main_frame, text="Browse", command=self.browse_destination).grid(row=row, column=2, pady=(0, 5))
-        row += 1
-        
-        # Separator
-        ttk.Separator(main_frame, orient='horizontal').grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=15)
-        row += 1
-        
-        # Folder structure options
-        ttk.Label(main_frame, text="Folder Structure:", font=('TkDefaultFont', 10, 'bold')).grid(row=row, column=0, columnspan=3, sticky=tk.W, pady=(0, 10))
-        row += 1
-        
-        folder_frame = ttk.Frame(main_frame)
-        folder_frame.grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
-        
-        ttk.Radiobutton(folder_frame, text="Year/Month (2024/01)", variable=self.folder_structure, value="year_month").pack(anchor=tk.W)
-        ttk.Radiobutton(folder_frame, text="Year only (2024)", variable=self.folder_structure, value="year_only").pack(anchor=tk.W)
-        ttk.Radiobutton(folder_frame, text="Flat (no subfolders)", variable=self.folder_structure, value="flat").pack(anchor=tk.W)
-        ttk.Radiobutton(folder_frame, text="Year/Month/Day (2024/01/15)", variable=self.folder_structure, value="year_month_day").pack(anchor=tk.W)
-        row += 1
-        
-        # Filename format options
-        ttk.Label(main_frame, text="Filename Format:", font=('TkDefaultFont', 10, 'bold')).grid(row=row, column=0, columnspan=3, sticky=tk.W, pady=(10, 10))
-        row += 1
-        
-        filename_frame = ttk.Frame(main_frame)
-        filename_frame.grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
-        
-        ttk.Radiobutton(filename_frame, text="Date + Original (20240115_IMG_1234.jpg)", variable=self.filename_format, value="date_original").pack(anchor=tk.W)
-        ttk.Radiobutton(filename_frame, text="Original filename only (IMG_1234.jpg)", variable=self.filename_format, value="original_only").pack(anchor=tk.W)
-        ttk.Radiobutton(filename_frame, text="Date only (20240115_143022.jpg)", variable=self.filename_format, value="date_only").pack(anchor=tk.W)
-        ttk.Radiobutton(filename_frame, text="Date + Time + Original (20240115_143022_IMG_1234.jpg)", variable=self.filename_format, value="datetime_original").pack(anchor=tk.W)
-        row += 1
-        
-        # Separator
-        ttk.Separator(main_frame, orient='horizontal').grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=15)
-        row += 1
-        
-        # Metadata options
-        ttk.Label(main_frame, text="Metadata Options:", font=('TkDefaultFont', 10, 'bold')).grid(row=row, column=0, columnspan=3, sticky=tk.W, pady=(0, 10))
-        row += 1
-        
-        metadata_frame = ttk.Frame(main_frame)
-        metadata_frame.grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
-        
-        ttk.Checkbutton(metadata_frame, text="Include XMP sidecar files", variable=self.include_xmp).pack(anchor=tk.W)
-        ttk.Checkbutton(metadata_frame, text="Include keywords in XMP", variable=self.include_keywords).pack(anchor=tk.W)
-        ttk.Checkbutton(metadata_frame, text="Include person tags in XMP", variable=self.include_person_tags).pack(anchor=tk.W)
-        
-        # Test mode option
-        self.test_mode = tk.BooleanVar(value=False)
-        ttk.Checkbutton(metadata_frame, text="Test mode (first 20 files only)", variable=self.test_mode).pack(anchor=tk.W)
-        row += 1
-        
-        # Progress bar
-        self.progress_var = tk.DoubleVar()
-        self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, maximum=100)
-        self.progress_bar.grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(20, 5))
-        row += 1
-        
-        # Status label
-        self.status_var = tk.StringVar(value="Ready")
-        ttk.Label(main_frame, textvariable=self.status_var).grid(row=row, column=0, columnspan=3, sticky=tk.W, pady=(0, 10))
-        row += 1
-        
-        # Buttons
-        button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=row, column=0, columnspan=3, pady=20)
+# Per-library settings used when a batch job entry leaves them out (same as the GUI defaults)
+BATCH_DEFAULTS = {
+    "folder_structure": "year_month",
+    "filename_format": "date_original",
+    "include_xmp": True,
+    "test_mode": False
+}
+
+# Streaming copy tuning: large chunks keep syscalls rare on multi-GB videos while
+# still giving regular points for progress, pause and cancellation
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+# fcntl(F_PREALLOCATE) values from macOS <sys/fcntl.h>; Python's fcntl module doesn't export them all
+MACOS_F_PREALLOCATE = 42
+MACOS_F_ALLOCATECONTIG = 0x2
+MACOS_F_ALLOCATEALL = 0x4
+MACOS_F_PEOFPOSMODE = 3
+
+# Errors meaning a kernel copy fast path isn't available for this pair of files
+FAST_PATH_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTSOCK, errno.EBADF}
+
+# Manifest formats by output file extension
+MANIFEST_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".sqlite": "sqlite", ".db": "sqlite"}
+
+# Manifest columns, plus the EXIF GPS fields added when the originals are read
+MANIFEST_COLUMNS = [
+    "uuid", "original_filename", "original_path", "date_created", "timezone_name", "timezone_offset",
+    "latitude", "longitude", "camera_make", "camera_model", "focal_length", "aperture", "iso",
+    "shutter_speed", "flash_fired", "keywords", "people"
+]
+MANIFEST_GPS_FIELDS = [
+    "gps_positioning_error", "gps_direction", "gps_direction_ref", "gps_altitude", "gps_altitude_ref",
+    "gps_speed", "gps_speed_ref", "gps_time_stamp"
+]
+
+# Per-asset outcomes counted in the event log and metrics
+TELEMETRY_OUTCOMES = ("copied", "duplicate", "missing", "no_date", "failed", "cancelled")
+
+# Asset rows in the order unpacked by extract_photos and create_xmp_sidecar
+ASSET_QUERY = """
+SELECT 
+    a.ZUUID, 
+    a.ZFILENAME, 
+    a.ZDIRECTORY,
+    aaa.ZORIGINALFILENAME,
+    a.ZDATECREATED,
+    a.ZLATITUDE, 
+    a.ZLONGITUDE,
+    ext.ZCAMERAMAKE,
+    ext.ZCAMERAMODEL,
+    ext.ZFOCALLENGTH,
+    ext.ZAPERTURE,
+    ext.ZISO,
+    ext.ZSHUTTERSPEED,
+    ext.ZFLASHFIRED,
+    ext.ZLATITUDE as ext_lat,
+    ext.ZLONGITUDE as ext_lon,
+    ext.ZTIMEZONEOFFSET,
+    ext.ZTIMEZONENAME
+FROM ZASSET a 
+LEFT JOIN ZADDITIONALASSETATTRIBUTES aaa ON a.ZADDITIONALATTRIBUTES = aaa.Z_PK 
+LEFT JOIN ZEXTENDEDATTRIBUTES ext ON a.ZEXTENDEDATTRIBUTES = ext.Z_PK
+WHERE a.ZTRASHEDSTATE = 0
+ORDER BY a.ZDATECREATED
+"""
+
+class CopyCancelled(Exception):
+    """Raised inside a copy when the run has been cancelled"""
+    
+class CopyControl:
+    """Cooperative pause/resume/cancel shared by every copy in a run"""
+    
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.running = threading.Event()
+        self.running.set()
+        
+    def pause(self):
+        self.running.clear()
+        
+    def resume(self):
+        self.running.set()
+        
+    def cancel(self):
+        self.cancelled.set()
+        # Wake up anything waiting in a paused checkpoint so it can bail out
+        self.running.set()
+        
+    def is_paused(self):
+        return not self.running.is_set()
+        
+    def checkpoint(self):
+        """Block while paused and raise CopyCancelled once cancelled"""
+        self.running.wait()
+        if self.cancelled.is_set():
+            raise CopyCancelled()
+            
+class RunTelemetry:
+    """JSON-lines event log and Prometheus textfile metrics for one extraction run"""
+    
+    def __init__(self, mode, events_path=None, metrics_path=None):
+        self.mode = mode
+        self.metrics_path = metrics_path
+        self.run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+        # Monotonic so an NTP step can't fake a slowdown; wall time is only used for timestamps
+        self.started = time.monotonic()
+        self.finished = False
+        
+        # Set when the event log or metrics file couldn't be written; the run itself carries on
+        self.error = None
+        self.lock = threading.Lock()
+        
+        # Fail at the start of the run rather than after copying everything
+        if metrics_path:
+            metrics_dir = os.path.dirname(os.path.abspath(metrics_path))
+            if not os.access(metrics_dir, os.W_OK):
+                raise OSError(errno.EACCES, "Metrics directory is missing or not writable", metrics_dir)
+                
+        # Appended to so a cron job keeps one log across runs
+        self.events = open(events_path, 'a', encoding='utf-8') if events_path else None
         
-        self.extract_button = ttk.Button(button_frame, text="Extract Photos", command=self.start_extraction)
-        self.extract_button.pack(side=tk.LEFT, padx=(0, 10))
+        # Asset counts keyed by (library, outcome)
+        self.counts = {}
+        self.bytes_copied = 0
+        self.xmp_failures = 0
         
-        ttk.Button(button_frame, text="Exit", command=self.root.quit).pack(side=tk.LEFT)
+        self.emit("run_start", mode=mode)
         
-    def browse_library(self):
-        library_path = filedialog.askopenfilename(
-            title="Select Photos Library Package",
-            filetypes=[("All files", "*.*")]
-        )
-        if library_path:
-            self.library_path.set(library_path)
-            
-    def browse_destination(self):
-        destination_path = filedialog.askdirectory(
-            title="Select Destination Folder"
-        )
-        if destination_path:
-            self.destination_path.set(destination_path)
-            
-    def validate_inputs(self):
-        if not self.library_path.get():
-            messagebox.showerror("Missing Input", "Please select a Photos Library")
-            return False
+    def emit(self, event, **fields):
+        """Append one event line; flushed immediately so a crash still leaves a usable log"""
+        if not self.events:
+            return
+        record = {
+            "ts": datetime.now(dt_timezone.utc).isoformat(timespec="milliseconds"),
+            "run_id": self.run_id,
+            "event": event
+        }
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            if not self.events:
+                return
+            try:
+                self.events.write(line + "\n")
+                self.events.flush()
+            except OSError as e:
+                # A full disk shouldn't turn finished copies into failures; stop logging instead
+                print(f"Error writing event log: {e}", file=sys.stderr)
+                self.error = f"event log: {e}"
+                self.events = None
             
-        if not self.destination_path.get():
-            messagebox.showerror("Missing Input", "Please select a destination folder")
-            return False
+    def record_asset(self, library, uuid, filename, outcome, num_bytes=0, duration=0.0, error=None):
+        with self.lock:
+            key = (library, outcome)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.bytes_copied += num_bytes
             
-        if not os.path.exists(self.library_path.get()):
-            messagebox.showerror("Invalid Path", "Photos Library path does not exist")
-            return False
+        fields = {
+            "library": library,
+            "uuid": uuid,
+            "file": filename,
+            "outcome": outcome,
+            "bytes": num_bytes,
+            "duration_seconds": round(duration, 4)
+        }
+        if error is not None:
+            fields["error_class"] = type(error).__name__
+            fields["error"] = str(error)
+        self.emit("asset", **fields)
+        
+    def record_xmp_error(self, library, uuid, filename, error):
+        with self.lock:
+            self.xmp_failures += 1
+        self.emit("xmp_error", library=library, uuid=uuid, file=filename, error_class=type(error).__name__, error=str(error))
+        
+    def record_library_error(self, library, message):
+        with self.lock:
+            key = (library, "library_error")
+            self.counts[key] = self.counts.get(key, 0) + 1
+        self.emit("library_error", library=library, error=message)
+        
+    def finish(self, status):
+        """Log the run totals and write the metrics file; later calls are ignored
+        
+        Write failures are reported on stderr and kept in self.error rather than raised,
+        so a finished run still gets its report.
+        """
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
             
-        if not os.path.exists(self.destination_path.get()):
-            messagebox.showerror("Invalid Path", "Destination path does not exist")
-            return False
+        elapsed = time.monotonic() - self.started
+        totals = {outcome: 0 for outcome in TELEMETRY_OUTCOMES}
+        for (library, outcome), count in self.counts.items():
+            if outcome in totals:
+                totals[outcome] += count
+                
+        self.emit(
+            "run_end",
+            status=status,
+            duration_seconds=round(elapsed, 3),
+            bytes=self.bytes_copied,
+            bytes_per_second=round(self.bytes_copied / elapsed, 1) if elapsed else 0,
+            xmp_failures=self.xmp_failures,
+            assets=totals
+        )
+        
+        if self.metrics_path:
+            try:
+                self.write_metrics(status, elapsed, totals)
+            except OSError as e:
+                print(f"Error writing metrics file: {e}", file=sys.stderr)
+                self.error = f"metrics file: {e}"
+                
+        with self.lock:
+            if self.events:
+                try:
+                    self.events.close()
+                except OSError as e:
+                    self.error = self.error or f"event log: {e}"
+                self.events = None
             
-        # Check if library contains Photos.sqlite
-        db_path = os.path.join(self.library_path.get(), "database", "Photos.sqlite")
-        if not os.path.exists(db_path):
-            messagebox.showerror("Invalid Library", "Selected library does not contain Photos.sqlite database")
-            return False
+    def write_metrics(self, status, elapsed, totals):
+        """Write the Prometheus textfile atomically so node_exporter never reads a half-written file"""
+        def label(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
             
-        return True
-        
-    def start_extraction(self):
-        if not self.validate_inputs():
-            return
+        libraries = sorted({library for library, outcome in self.counts}) or [""]
+        prefix = "photos_extract_last_run"
+        lines = [
+            f"# HELP {prefix}_assets Assets handled in the last run by library and outcome",
+            f"# TYPE {prefix}_assets gauge"
+        ]
+        for library in libraries:
+            # Full path, since family libraries usually share the default package name
+            name = label(library)
+            for outcome in TELEMETRY_OUTCOMES:
+                lines.append(f'{prefix}_assets{{library="{name}",outcome="{outcome}"}} {self.counts.get((library, outcome), 0)}')
+                
+        library_errors = sum(count for (library, outcome), count in self.counts.items() if outcome == "library_error")
+        gauges = [
+            ("success", "1 if the last run completed without being cancelled or aborted", 1 if status == "completed" else 0),
+            ("cancelled", "1 if the last run was cancelled", 1 if status == "cancelled" else 0),
+            ("timestamp_seconds", "Unix time the last run finished", round(time.time(), 3)),
+            ("duration_seconds", "Wall time of the last run", round(elapsed, 3)),
+            ("bytes", "Bytes of originals copied in the last run", self.bytes_copied),
+            ("throughput_bytes_per_second", "Bytes copied per second of wall time", round(self.bytes_copied / elapsed, 1) if elapsed else 0),
+            ("assets_per_second", "Assets handled per second of wall time", round(sum(totals.values()) / elapsed, 3) if elapsed else 0),
+            ("failures", "Originals that failed to copy", totals["failed"]),
+            ("xmp_failures", "XMP sidecars that failed to generate", self.xmp_failures),
+            ("library_errors", "Libraries that could not be opened", library_errors)
+        ]
+        for name, help_text, value in gauges:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f'{prefix}_{name}{{mode="{self.mode}"}} {value}')
             
-        # Disable the extract button during processing
-        self.extract_button.configure(state='disabled')
-        self.status_var.set("Starting extraction...")
-        self.progress_var.set(0)
-        
-        # Start extraction in a separate thread
-        extraction_thread = threading.Thread(target=self.run_extraction)
-        extraction_thread.daemon = True
-        extraction_thread.start()
-        
-    def run_extraction(self):
+        metrics_dir = os.path.dirname(os.path.abspath(self.metrics_path))
+        fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.metrics_path)}.", dir=metrics_dir)
         try:
-            self.extract_photos()
-        except Exception as e:
-            messagebox.showerror("Extraction Error", f"An error occurred during extraction:\n{str(e)}")
-        finally:
-            # Re-enable the extract button
-            self.extract_button.configure(state='normal')
-            self.status_var.set("Ready")
-            self.progress_var.set(0)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.metrics_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+            
+class PhotoLibraryExtractor:
+    """Library reading and XMP sidecar generation shared by the GUI and batch mode"""
+    
+    # RunTelemetry for the run in progress, if event logging or metrics are enabled
+    telemetry = None
+    
+    def record_asset(self, library, uuid, filename, outcome, num_bytes=0, started=None, error=None):
+        """Report one asset's outcome to telemetry, if enabled"""
+        if self.telemetry:
+            duration = time.monotonic() - started if started else 0.0
+            self.telemetry.record_asset(library, uuid, filename, outcome, num_bytes, duration, error)
             
-    def get_folder_path(self, creation_date):
+    def get_folder_path(self, creation_date, folder_structure):
         """Generate folder path based on selected structure"""
-        if self.folder_structure.get() == "flat":
+        if folder_structure == "flat":
             return ""
-        elif self.folder_structure.get() == "year_only":
+        elif folder_structure == "year_only":
             return str(creation_date.year)
-        elif self.folder_structure.get() == "year_month":
+        elif folder_structure == "year_month":
             return f"{creation_date.year}/{creation_date.month:02d}"
-        elif self.folder_structure.get() == "year_month_day":
+        elif folder_structure == "year_month_day":
             return f"{creation_date.year}/{creation_date.month:02d}/{creation_date.day:02d}"
         return ""
         
-    def get_filename(self, original_filename, creation_date):
+    def get_filename(self, original_filename, creation_date, filename_format):
         """Generate filename based on selected format"""
         base_name, ext = os.path.splitext(original_filename)
         date_str = creation_date.strftime("%Y%m%d")
         datetime_str = creation_date.strftime("%Y%m%d_%H%M%S")
         
-        if self.filename_format.get() == "original_only":
+        if filename_format == "original_only":
             return original_filename
-        elif self.filename_format.get() == "date_only":
+        elif filename_format == "date_only":
             return f"{datetime_str}{ext}"
-        elif self.filename_format.get() == "date_original":
+        elif filename_format == "date_original":
             return f"{date_str}_{original_filename}"
-        elif self.filename_format.get() == "datetime_original":
+        elif filename_format == "datetime_original":
             return f"{datetime_str}_{original_filename}"
         return original_filename
         
-    def extract_photos(self):
-        library_path = self.library_path.get()
-        destination_path = self.destination_path.get()
-        
+    def format_size(self, num_bytes):
+        """Human readable byte count for progress messages"""
+        for unit in ("B", "KB", "MB", "GB"):
+            if num_bytes < 1024 or unit == "GB":
+                return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+            num_bytes /= 1024
+            
+    def file_digest(self, path):
+        """SHA-256 of a file's contents"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+        
+    def check_library_paths(self, library_path, destination_path):
+        """Return an (error title, message) pair if the paths can't be extracted, otherwise None"""
+        if not os.path.exists(library_path):
+            return "Invalid Path", "Photos Library path does not exist"
+            
+        if not os.path.exists(destination_path):
+            return "Invalid Path", "Destination path does not exist"
+            
+        # Check if library contains Photos.sqlite
         db_path = os.path.join(library_path, "database", "Photos.sqlite")
-        originals_path = os.path.join(library_path, "originals")
-        
-        # Connect to database
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        if not os.path.exists(db_path):
+            return "Invalid Library", "Selected library does not contain Photos.sqlite database"
+            
+        return None
         
-        # Get total count for progress tracking
-        cursor.execute("SELECT COUNT(*) FROM ZASSET WHERE ZTRASHEDSTATE = 0")
-        total_assets = cursor.fetchone()[0]
+    def preallocate(self, fd, size):
+        """Best-effort reservation of size bytes for a new file (posix_fallocate, or F_PREALLOCATE on macOS)"""
+        try:
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(fd, 0, size)
+            elif sys.platform == "darwin":
+                import fcntl
+                f_preallocate = getattr(fcntl, 'F_PREALLOCATE', MACOS_F_PREALLOCATE)
+                
+                # Ask for one contiguous extent first, then settle for any allocation
+                for flags in (MACOS_F_ALLOCATECONTIG | MACOS_F_ALLOCATEALL, MACOS_F_ALLOCATEALL):
+                    # fstore_t: flags, position mode, offset, length, bytes allocated (out)
+                    fstore = struct.pack('IiqqQ', flags, MACOS_F_PEOFPOSMODE, 0, size, 0)
+                    try:
+                        fcntl.fcntl(fd, f_preallocate, fstore)
+                        break
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+            
+    def stream_copy(self, source, dest, control=None, progress_callback=None):
+        """Copy source to dest in chunks via a temporary file renamed into place, like shutil.copy2"""
+        size = os.path.getsize(source)
+        fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(dest)}.", suffix=".partial", dir=os.path.dirname(dest) or ".")
         
-        self.root.after(0, lambda: self.status_var.set(f"Found {total_assets} assets to extract"))
+        try:
+            if size <= COPY_CHUNK_SIZE and not hasattr(os, 'copy_file_range'):
+                # Single-chunk files have no progress to report, so let shutil use the
+                # platform's own fast copy (fcopyfile on macOS)
+                os.close(fd)
+                if control:
+                    control.checkpoint()
+                shutil.copyfile(source, temp_path)
+                copied = size
+                if progress_callback and size:
+                    progress_callback(size)
+            else:
+                with open(source, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                    src_fd, dst_fd = src.fileno(), dst.fileno()
+                    
+                    # Reserve the space up front so large videos don't fragment or fail halfway on a full disk
+                    if size:
+                        self.preallocate(dst_fd, size)
+                        
+                    # Prefer in-kernel copies, falling back when the filesystem or platform doesn't support them
+                    if hasattr(os, 'copy_file_range'):
+                        method = "copy_file_range"
+                    elif hasattr(os, 'sendfile') and sys.platform != "darwin":
+                        method = "sendfile"
+                    else:
+                        method = "read"
+                        
+                    copied = 0
+                    while copied < size:
+                        if control:
+                            control.checkpoint()
+                            
+                        count = min(COPY_CHUNK_SIZE, size - copied)
+                        try:
+                            if method == "copy_file_range":
+                                written = os.copy_file_range(src_fd, dst_fd, count, copied, copied)
+                            elif method == "sendfile":
+                                os.lseek(dst_fd, copied, os.SEEK_SET)
+                                written = os.sendfile(dst_fd, src_fd, copied, count)
+                            else:
+                                written = os.pwrite(dst_fd, os.pread(src_fd, count, copied), copied)
+                        except OSError as e:
+                            if method == "read" or e.errno not in FAST_PATH_ERRNOS:
+                                raise
+                            method = "sendfile" if method == "copy_file_range" and hasattr(os, 'sendfile') else "read"
+                            continue
+                            
+                        if not written:
+                            if method != "read":
+                                method = "read"
+                                continue
+                            raise OSError(f"{source} shrank while being copied")
+                            
+                        copied += written
+                        if progress_callback:
+                            progress_callback(written)
+                            
+            shutil.copystat(source, temp_path)
+            os.replace(temp_path, dest)
+        except BaseException:
+            # Never leave a partial file behind, whether the copy failed or was cancelled
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+            
+        return copied
         
-        # Query all assets (using exact query structure from working version)
-        query = """
-        SELECT 
-            a.ZUUID, 
-            a.ZFILENAME, 
-            a.ZDIRECTORY,
-            aaa.ZORIGINALFILENAME,
-            a.ZDATECREATED,
-            a.ZLATITUDE, 
-            a.ZLONGITUDE,
-            ext.ZCAMERAMAKE,
-            ext.ZCAMERAMODEL,
-            ext.ZFOCALLENGTH,
-            ext.ZAPERTURE,
-            ext.ZISO,
-            ext.ZSHUTTERSPEED,
-            ext.ZFLASHFIRED,
-            ext.ZLATITUDE as ext_lat,
-            ext.ZLONGITUDE as ext_lon,
-            ext.ZTIMEZONEOFFSET,
-            ext.ZTIMEZONENAME
+    def generate_xmp_file(self, image_path, asset_data, keywords, conn, exif_path=None, library=None):
+        """Generate XMP sidecar matching Apple Photos format exactly like working version"""
+        try:
+            # Unpack all metadata exactly like working version
+            uuid, filename, directory, original_filename, date_created, lat, lon, make, model, focal_length, aperture, iso, shutter_speed, flash_fired, ext_lat, ext_lon, timezone_offset, timezone_name = asset_data
+            
+            # Use extended attributes coordinates if available (higher precision)
+            if ext_lat is not None and ext_lon is not None:
+                lat, lon = ext_lat, ext_lon
+            
+            # Create XMP sidecar using exact logic from working version
+            # (EXIF is read from exif_path when image_path was never written, e.g. a skipped duplicate)
+            xmp_path = os.path.splitext(image_path)[0] + ".xmp"
+            self.create_xmp_sidecar(asset_data, keywords, xmp_path, exif_path or image_path)
+                
+        except Exception as e:
+            print(f"Error generating XMP for {original_filename}: {e}")
+            if self.telemetry:
+                self.telemetry.record_xmp_error(library, uuid, original_filename, e)
+            
+    def get_asset_keywords(self, uuid, conn):
+        """Get keywords/tags and person names for an asset exactly like working version"""
+        # Get regular keywords
+        keyword_query = """
+        SELECT k.ZTITLE
         FROM ZASSET a 
         LEFT JOIN ZADDITIONALASSETATTRIBUTES aaa ON a.ZADDITIONALATTRIBUTES = aaa.Z_PK 
-        LEFT JOIN ZEXTENDEDATTRIBUTES ext ON a.ZEXTENDEDATTRIBUTES = ext.Z_PK
-        WHERE a.ZTRASHEDSTATE = 0
-        ORDER BY a.ZDATECREATED
+        LEFT JOIN Z_1KEYWORDS z1k ON aaa.Z_PK = z1k.Z_1ASSETATTRIBUTES 
+        LEFT JOIN ZKEYWORD k ON z1k.Z_51KEYWORDS = k.Z_PK 
+        WHERE a.ZUUID = ? AND k.ZTITLE IS NOT NULL
         """
         
-        cursor.execute(query)
-        all_assets = cursor.fetchall()
+        # Get person names
+        person_query = """
+        SELECT DISTINCT p.ZDISPLAYNAME
+        FROM ZASSET a 
+        LEFT JOIN ZDETECTEDFACE df ON a.Z_PK = df.ZASSETFORFACE
+        LEFT JOIN ZPERSON p ON df.ZPERSONFORFACE = p.Z_PK
+        WHERE a.ZUUID = ? AND p.ZDISPLAYNAME IS NOT NULL AND p.ZDISPLAYNAME != ''
+        """
         
-        # Limit to first 20 files in test mode
-        if self.test_mode.get():
-            assets = all_assets[:20]
-            self.root.after(0, lambda: self.status_var.set(f"Test mode: Processing first 20 of {len(all_assets)} assets"))
-        else:
-            assets = all_assets
+        cursor = conn.cursor()
         
-        processed = 0
-        successful = 0
-        
-        for asset in assets:
-            # Unpack all metadata fields exactly like working version
-            uuid, filename, directory, original_filename, date_created, lat, lon, make, model, focal_length, aperture, iso, shutter_speed, flash_fired, ext_lat, ext_lon, timezone_offset, timezone_name = asset
-            
-            # Use original filename if available, otherwise use filename
-            if not original_filename:
-                original_filename = filename
-                
-            # Convert Core Data timestamp to datetime
-            if not date_created:
-                continue
-                
-            creation_date = datetime.fromtimestamp(date_created + 978307200)
-                
-            # Update progress
-            processed += 1
-            progress = (processed / len(assets)) * 100
-            self.root.after(0, lambda p=progress: self.progress_var.set(p))
-            self.root.after(0, lambda f=original_filename: self.status_var.set(f"Processing: {f}"))
-            
-            # Find original file using directory path from database
-            original_file = os.path.join(originals_path, directory, filename)
-            
-            if not os.path.exists(original_file):
-                continue
-                
-            # Generate destination paths
-            folder_path = self.get_folder_path(creation_date)
-            new_filename = self.get_filename(original_filename, creation_date)
-            
-            # Create destination directory
-            if folder_path:
-                dest_dir = os.path.join(destination_path, folder_path)
-                os.makedirs(dest_dir, exist_ok=True)
-            else:
-                dest_dir = destination_path
-                
-            dest_file = os.path.join(dest_dir, new_filename)
-            
-            # Copy original file
-            try:
-                import shutil
-                shutil.copy2(original_file, dest_file)
-                successful += 1
-                
-                # Generate XMP if requested
-                if self.include_xmp.get():
-                    # Get keywords exactly like working version
-                    keywords = self.get_asset_keywords(uuid, conn)
-                    self.generate_xmp_file(dest_file, asset, keywords, conn)
-                    
-            except Exception as e:
-                print(f"Error copying {original_filename}: {e}")
-                continue
-                
-        conn.close()
-        
-        # Show completion message
-        self.root.after(0, lambda: messagebox.showinfo(
-            "Extraction Complete", 
-            f"Successfully extracted {successful} out of {total_assets} photos"
-        ))
-        
-    def generate_xmp_file(self, image_path, asset_data, keywords, conn):
-        """Generate XMP sidecar matching Apple Photos format exactly like working version"""
-        try:
-            # Unpack all metadata exactly like working version
-            uuid, filename, directory, original_filename, date_created, lat, lon, make, model, focal_length, aperture, iso, shutter_speed, flash_fired, ext_lat, ext_lon, timezone_offset, timezone_name = asset_data
-            
-            # Use extended attributes coordinates if available (higher precision)
-            if ext_lat is not None and ext_lon is not None:
-                lat, lon = ext_lat, ext_lon
-            
-            # Create XMP sidecar using exact logic from working version
-            xmp_path = os.path.splitext(image_path)[0] + ".xmp"
-            self.create_xmp_sidecar(asset_data, keywords, xmp_path, image_path)
-                
-        except Exception as e:
-            print(f"Error generating XMP for {original_filename}: {e}")
-            
-    def get_asset_keywords(self, uuid, conn):
-        """Get keywords/tags and person names for an asset exactly like working version"""
-        # Get regular keywords
-        keyword_query = """
-        SELECT k.ZTITLE
-        FROM ZASSET a 
-        LEFT JOIN ZADDITIONALASSETATTRIBUTES aaa ON a.ZADDITIONALATTRIBUTES = aaa.Z_PK 
-        LEFT JOIN Z_1KEYWORDS z1k ON aaa.Z_PK = z1k.Z_1ASSETATTRIBUTES 
-        LEFT JOIN ZKEYWORD k ON z1k.Z_51KEYWORDS = k.Z_PK 
-        WHERE a.ZUUID = ? AND k.ZTITLE IS NOT NULL
-        """
-        
-        # Get person names
-        person_query = """
-        SELECT DISTINCT p.ZDISPLAYNAME
-        FROM ZASSET a 
-        LEFT JOIN ZDETECTEDFACE df ON a.Z_PK = df.ZASSETFORFACE
-        LEFT JOIN ZPERSON p ON df.ZPERSONFORFACE = p.Z_PK
-        WHERE a.ZUUID = ? AND p.ZDISPLAYNAME IS NOT NULL AND p.ZDISPLAYNAME != ''
-        """
-        
-        cursor = conn.cursor()
-        
-        # Get keywords
-        cursor.execute(keyword_query, (uuid,))
-        keywords = [row[0] for row in cursor.fetchall()]
+        # Get keywords
+        cursor.execute(keyword_query, (uuid,))
+        keywords = [row[0] for row in cursor.fetchall()]
         
         # Get person names
         cursor.execute(person_query, (uuid,))
@@ -495,18 +622,8 @@ class PhotoExtractGUI:
             
         return exif_data
         
-    def create_xmp_sidecar(self, metadata, keywords, output_path, original_file_path):
-        """Generate XMP sidecar matching Apple Photos format - exact copy from working version"""
-        
-        uuid, filename, directory, original_filename, date_created, lat, lon, make, model, focal_length, aperture, iso, shutter_speed, flash_fired, ext_lat, ext_lon, timezone_offset, timezone_name = metadata
-        
-        # Use extended attributes coordinates if available (higher precision)
-        if ext_lat is not None and ext_lon is not None:
-            lat, lon = ext_lat, ext_lon
-        
-        # Extract GPS data from EXIF using individual field calls for accuracy
-        import subprocess
-        
+    def read_gps_exif(self, original_file_path):
+        """Read the EXIF GPS fields used in XMP sidecars, using individual exiftool calls for accuracy"""
         gps_positioning_error = None
         gps_direction = None
         gps_direction_ref = None
@@ -627,6 +744,36 @@ class PhotoExtractGUI:
                 
         except Exception:
             pass
+            
+        return {
+            "gps_positioning_error": gps_positioning_error,
+            "gps_direction": gps_direction,
+            "gps_direction_ref": gps_direction_ref,
+            "gps_altitude": gps_altitude,
+            "gps_altitude_ref": gps_altitude_ref,
+            "gps_speed": gps_speed,
+            "gps_speed_ref": gps_speed_ref,
+            "gps_time_stamp": gps_time_stamp
+        }
+        
+    def create_xmp_sidecar(self, metadata, keywords, output_path, original_file_path):
+        """Generate XMP sidecar matching Apple Photos format - exact copy from working version"""
+        
+        uuid, filename, directory, original_filename, date_created, lat, lon, make, model, focal_length, aperture, iso, shutter_speed, flash_fired, ext_lat, ext_lon, timezone_offset, timezone_name = metadata
+        
+        # Use extended attributes coordinates if available (higher precision)
+        if ext_lat is not None and ext_lon is not None:
+            lat, lon = ext_lat, ext_lon
+        
+        # Extract GPS data from EXIF using individual field calls for accuracy
+        gps = self.read_gps_exif(original_file_path)
+        gps_direction = gps["gps_direction"]
+        gps_direction_ref = gps["gps_direction_ref"]
+        gps_altitude = gps["gps_altitude"]
+        gps_altitude_ref = gps["gps_altitude_ref"]
+        gps_speed = gps["gps_speed"]
+        gps_speed_ref = gps["gps_speed_ref"]
+        gps_time_stamp = gps["gps_time_stamp"]
         
         # Check if we have GPS data to determine namespaces
         has_gps_data = (lat and lon and lat != -180.0 and lon != -180.0) or gps_direction or gps_altitude or gps_speed
@@ -720,9 +867,1175 @@ class PhotoExtractGUI:
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(xmp_content)
 
-def main():
+class PhotoExtractGUI(PhotoLibraryExtractor):
+    def __init__(self, root, events_log=None, metrics_file=None):
+        self.root = root
+        self.root.title("Photos Library Extractor")
+        self.root.geometry("720x650")
+        
+        # Variables
+        self.library_path = tk.StringVar()
+        self.destination_path = tk.StringVar()
+        self.folder_structure = tk.StringVar(value="year_month")
+        self.filename_format = tk.StringVar(value="date_original")
+        self.include_xmp = tk.BooleanVar(value=True)
+        self.include_keywords = tk.BooleanVar(value=True)
+        self.include_person_tags = tk.BooleanVar(value=True)
+        
+        # Pause/cancel state for the run in progress
+        self.copy_control = None
+        
+        # Telemetry destinations from the command line
+        self.events_log = events_log
+        self.metrics_file = metrics_file
+        
+        self.create_widgets()
+        
+    def create_widgets(self):
+        # Main frame
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # Configure grid weights
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(1, weight=1)
+        
+        row = 0
+        
+        # Library selection
+        ttk.Label(main_frame, text="Photos Library:").grid(row=row, column=0, sticky=tk.W, pady=(0, 5))
+        ttk.Entry(main_frame, textvariable=self.library_path, width=50).grid(row=row, column=1, sticky=(tk.W, tk.E), padx=(10, 5), pady=(0, 5))
+        ttk.Button(main_frame, text="Browse", command=self.browse_library).grid(row=row, column=2, pady=(0, 5))
+        row += 1
+        
+        # Destination selection
+        ttk.Label(main_frame, text="Destination:").grid(row=row, column=0, sticky=tk.W, pady=(0, 5))
+        ttk.Entry(main_frame, textvariable=self.destination_path, width=50).grid(row=row, column=1, sticky=(tk.W, tk.E), padx=(10, 5), pady=(0, 5))
+        ttk.Button(main_frame, text="Browse", command=self.browse_destination).grid(row=row, column=2, pady=(0, 5))
+        row += 1
+        
+        # Separator
+        ttk.Separator(main_frame, orient='horizontal').grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=15)
+        row += 1
+        
+        # Folder structure options
+        ttk.Label(main_frame, text="Folder Structure:", font=('TkDefaultFont', 10, 'bold')).grid(row=row, column=0, columnspan=3, sticky=tk.W, pady=(0, 10))
+        row += 1
+        
+        folder_frame = ttk.Frame(main_frame)
+        folder_frame.grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        ttk.Radiobutton(folder_frame, text="Year/Month (2024/01)", variable=self.folder_structure, value="year_month").pack(anchor=tk.W)
+        ttk.Radiobutton(folder_frame, text="Year only (2024)", variable=self.folder_structure, value="year_only").pack(anchor=tk.W)
+        ttk.Radiobutton(folder_frame, text="Flat (no subfolders)", variable=self.folder_structure, value="flat").pack(anchor=tk.W)
+        ttk.Radiobutton(folder_frame, text="Year/Month/Day (2024/01/15)", variable=self.folder_structure, value="year_month_day").pack(anchor=tk.W)
+        row += 1
+        
+        # Filename format options
+        ttk.Label(main_frame, text="Filename Format:", font=('TkDefaultFont', 10, 'bold')).grid(row=row, column=0, columnspan=3, sticky=tk.W, pady=(10, 10))
+        row += 1
+        
+        filename_frame = ttk.Frame(main_frame)
+        filename_frame.grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        ttk.Radiobutton(filename_frame, text="Date + Original (20240115_IMG_1234.jpg)", variable=self.filename_format, value="date_original").pack(anchor=tk.W)
+        ttk.Radiobutton(filename_frame, text="Original filename only (IMG_1234.jpg)", variable=self.filename_format, value="original_only").pack(anchor=tk.W)
+        ttk.Radiobutton(filename_frame, text="Date only (20240115_143022.jpg)", variable=self.filename_format, value="date_only").pack(anchor=tk.W)
+        ttk.Radiobutton(filename_frame, text="Date + Time + Original (20240115_143022_IMG_1234.jpg)", variable=self.filename_format, value="datetime_original").pack(anchor=tk.W)
+        row += 1
+        
+        # Separator
+        ttk.Separator(main_frame, orient='horizontal').grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=15)
+        row += 1
+        
+        # Metadata options
+        ttk.Label(main_frame, text="Metadata Options:", font=('TkDefaultFont', 10, 'bold')).grid(row=row, column=0, columnspan=3, sticky=tk.W, pady=(0, 10))
+        row += 1
+        
+        metadata_frame = ttk.Frame(main_frame)
+        metadata_frame.grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        ttk.Checkbutton(metadata_frame, text="Include XMP sidecar files", variable=self.include_xmp).pack(anchor=tk.W)
+        ttk.Checkbutton(metadata_frame, text="Include keywords in XMP", variable=self.include_keywords).pack(anchor=tk.W)
+        ttk.Checkbutton(metadata_frame, text="Include person tags in XMP", variable=self.include_person_tags).pack(anchor=tk.W)
+        
+        # Test mode option
+        self.test_mode = tk.BooleanVar(value=False)
+        ttk.Checkbutton(metadata_frame, text="Test mode (first 20 files only)", variable=self.test_mode).pack(anchor=tk.W)
+        row += 1
+        
+        # Progress bar
+        self.progress_var = tk.DoubleVar()
+        self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, maximum=100)
+        self.progress_bar.grid(row=row, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(20, 5))
+        row += 1
+        
+        # Status label
+        self.status_var = tk.StringVar(value="Ready")
+        ttk.Label(main_frame, textvariable=self.status_var).grid(row=row, column=0, columnspan=3, sticky=tk.W, pady=(0, 10))
+        row += 1
+        
+        # Buttons
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=row, column=0, columnspan=3, pady=20)
+        
+        self.extract_button = ttk.Button(button_frame, text="Extract Photos", command=self.start_extraction)
+        self.extract_button.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.batch_button = ttk.Button(button_frame, text="Batch Export...", command=self.start_batch)
+        self.batch_button.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.manifest_button = ttk.Button(button_frame, text="Export Metadata...", command=self.start_manifest)
+        self.manifest_button.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.pause_button = ttk.Button(button_frame, text="Pause", command=self.toggle_pause, state='disabled')
+        self.pause_button.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_run, state='disabled')
+        self.cancel_button.pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Button(button_frame, text="Exit", command=self.root.quit).pack(side=tk.LEFT)
+        
+    def browse_library(self):
+        library_path = filedialog.askopenfilename(
+            title="Select Photos Library Package",
+            filetypes=[("All files", "*.*")]
+        )
+        if library_path:
+            self.library_path.set(library_path)
+            
+    def browse_destination(self):
+        destination_path = filedialog.askdirectory(
+            title="Select Destination Folder"
+        )
+        if destination_path:
+            self.destination_path.set(destination_path)
+            
+    def validate_inputs(self):
+        if not self.library_path.get():
+            messagebox.showerror("Missing Input", "Please select a Photos Library")
+            return False
+            
+        if not self.destination_path.get():
+            messagebox.showerror("Missing Input", "Please select a destination folder")
+            return False
+            
+        error = self.check_library_paths(self.library_path.get(), self.destination_path.get())
+        if error:
+            messagebox.showerror(*error)
+            return False
+            
+        return True
+        
+    def start_extraction(self):
+        if not self.validate_inputs():
+            return
+            
+        # Disable the extract button during processing
+        self.set_running(True)
+        self.status_var.set("Starting extraction...")
+        self.progress_var.set(0)
+        
+        # Start extraction in a separate thread
+        extraction_thread = threading.Thread(target=self.run_extraction)
+        extraction_thread.daemon = True
+        extraction_thread.start()
+        
+    def run_extraction(self):
+        try:
+            if self.events_log or self.metrics_file:
+                self.telemetry = RunTelemetry("gui", self.events_log, self.metrics_file)
+                
+            self.extract_photos()
+        except Exception as e:
+            messagebox.showerror("Extraction Error", f"An error occurred during extraction:\n{str(e)}")
+        finally:
+            # Re-enable the extract button
+            self.set_running(False)
+            self.status_var.set("Ready")
+            self.progress_var.set(0)
+            
+            # No-op if extract_photos already finished the run
+            if self.telemetry:
+                telemetry, self.telemetry = self.telemetry, None
+                telemetry.finish("failed")
+            
+    def set_running(self, running):
+        """Swap the start buttons for pause/cancel while a run is in progress"""
+        if running:
+            self.copy_control = CopyControl()
+        start_state = 'disabled' if running else 'normal'
+        control_state = 'normal' if running else 'disabled'
+        self.extract_button.configure(state=start_state)
+        self.batch_button.configure(state=start_state)
+        self.manifest_button.configure(state=start_state)
+        self.pause_button.configure(state=control_state, text="Pause")
+        self.cancel_button.configure(state=control_state)
+        
+    def toggle_pause(self):
+        if self.copy_control.is_paused():
+            self.copy_control.resume()
+            self.pause_button.configure(text="Pause")
+        else:
+            self.copy_control.pause()
+            self.pause_button.configure(text="Resume")
+            self.status_var.set("Paused")
+            
+    def cancel_run(self):
+        self.copy_control.cancel()
+        self.pause_button.configure(state='disabled')
+        self.cancel_button.configure(state='disabled')
+        self.status_var.set("Cancelling...")
+        
+    def start_batch(self):
+        job_path = filedialog.askopenfilename(
+            title="Select Batch Job File",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+        )
+        if not job_path:
+            return
+            
+        try:
+            job = load_batch_job(job_path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Invalid Batch Job", str(e))
+            return
+            
+        self.set_running(True)
+        self.status_var.set(f"Starting batch of {len(job['libraries'])} libraries...")
+        self.progress_var.set(0)
+        
+        batch_thread = threading.Thread(target=self.run_batch, args=(job,))
+        batch_thread.daemon = True
+        batch_thread.start()
+        
+    def run_batch(self, job):
+        control = self.copy_control
+        
+        def show_progress(completed, total, name, bytes_copied):
+            if control.is_paused() or control.cancelled.is_set():
+                return
+            progress = (completed / total) * 100 if total else 100
+            self.root.after(0, lambda p=progress: self.progress_var.set(p))
+            self.root.after(0, lambda f=name, b=self.format_size(bytes_copied): self.status_var.set(f"Processing: {f} ({b} copied)"))
+            
+        try:
+            # Command-line flags override the job file, as in the command-line batch mode
+            events_log = self.events_log or job.get("events_log")
+            metrics_file = self.metrics_file or job.get("metrics_file")
+            extractor = BatchExtractor(
+                job["libraries"],
+                workers=job.get("workers"),
+                dedupe=job.get("dedupe", False),
+                progress_callback=show_progress,
+                control=control,
+                telemetry=RunTelemetry("batch", events_log, metrics_file) if events_log or metrics_file else None
+            )
+            report = extractor.run()
+            
+            if job.get("report"):
+                with open(job["report"], 'w', encoding='utf-8') as f:
+                    json.dump(report, f, indent=2)
+                    
+            summary = format_batch_summary(report)
+            title = "Batch Cancelled" if report["cancelled"] else "Batch Complete"
+            self.root.after(0, lambda: messagebox.showinfo(title, summary))
+        except Exception as e:
+            messagebox.showerror("Batch Error", f"An error occurred during batch export:\n{str(e)}")
+        finally:
+            self.set_running(False)
+            self.status_var.set("Ready")
+            self.progress_var.set(0)
+            
+    def start_manifest(self):
+        if not self.library_path.get():
+            messagebox.showerror("Missing Input", "Please select a Photos Library")
+            return
+            
+        output_path = filedialog.asksaveasfilename(
+            title="Save Metadata Manifest",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("SQLite", "*.sqlite")]
+        )
+        if not output_path:
+            return
+            
+        error = self.check_library_paths(self.library_path.get(), os.path.dirname(output_path))
+        if error:
+            messagebox.showerror(*error)
+            return
+            
+        self.set_running(True)
+        self.status_var.set("Exporting metadata...")
+        self.progress_var.set(0)
+        
+        manifest_thread = threading.Thread(target=self.run_manifest, args=(output_path,))
+        manifest_thread.daemon = True
+        manifest_thread.start()
+        
+    def run_manifest(self, output_path):
+        def show_progress(processed, total):
+            progress = (processed / total) * 100 if total else 100
+            self.root.after(0, lambda p=progress: self.progress_var.set(p))
+            self.root.after(0, lambda: self.status_var.set(f"Exported {processed} of {total} assets"))
+            
+        try:
+            exporter = ManifestExporter(
+                self.library_path.get(),
+                output_path,
+                control=self.copy_control,
+                progress_callback=show_progress
+            )
+            count = exporter.run()
+            self.root.after(0, lambda: messagebox.showinfo("Export Complete", f"Wrote metadata for {count} assets to {output_path}"))
+        except CopyCancelled:
+            pass
+        except Exception as e:
+            messagebox.showerror("Export Error", f"An error occurred during metadata export:\n{str(e)}")
+        finally:
+            self.set_running(False)
+            self.status_var.set("Ready")
+            self.progress_var.set(0)
+            
+    def extract_photos(self):
+        library_path = self.library_path.get()
+        destination_path = self.destination_path.get()
+        
+        db_path = os.path.join(library_path, "database", "Photos.sqlite")
+        originals_path = os.path.join(library_path, "originals")
+        
+        # Connect to database
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        
+        # Get total count for progress tracking
+        cursor.execute("SELECT COUNT(*) FROM ZASSET WHERE ZTRASHEDSTATE = 0")
+        total_assets = cursor.fetchone()[0]
+        
+        self.root.after(0, lambda: self.status_var.set(f"Found {total_assets} assets to extract"))
+        
+        # Query all assets (using exact query structure from working version)
+        cursor.execute(ASSET_QUERY)
+        all_assets = cursor.fetchall()
+        
+        # Limit to first 20 files in test mode
+        if self.test_mode.get():
+            assets = all_assets[:20]
+            self.root.after(0, lambda: self.status_var.set(f"Test mode: Processing first 20 of {len(all_assets)} assets"))
+        else:
+            assets = all_assets
+        
+        processed = 0
+        successful = 0
+        cancelled = False
+        control = self.copy_control
+        
+        for asset in assets:
+            # Unpack all metadata fields exactly like working version
+            uuid, filename, directory, original_filename, date_created, lat, lon, make, model, focal_length, aperture, iso, shutter_speed, flash_fired, ext_lat, ext_lon, timezone_offset, timezone_name = asset
+            
+            # Use original filename if available, otherwise use filename
+            if not original_filename:
+                original_filename = filename
+                
+            # Convert Core Data timestamp to datetime
+            if not date_created:
+                self.record_asset(library_path, uuid, original_filename, "no_date")
+                continue
+                
+            creation_date = datetime.fromtimestamp(date_created + 978307200)
+                
+            # Update progress
+            processed += 1
+            progress = (processed / len(assets)) * 100
+            self.root.after(0, lambda p=progress: self.progress_var.set(p))
+            self.root.after(0, lambda f=original_filename: self.status_var.set(f"Processing: {f}"))
+            
+            # Find original file using directory path from database
+            original_file = os.path.join(originals_path, directory, filename)
+            
+            if not os.path.exists(original_file):
+                self.record_asset(library_path, uuid, original_filename, "missing")
+                continue
+                
+            # Generate destination paths
+            folder_path = self.get_folder_path(creation_date, self.folder_structure.get())
+            new_filename = self.get_filename(original_filename, creation_date, self.filename_format.get())
+            
+            # Create destination directory
+            if folder_path:
+                dest_dir = os.path.join(destination_path, folder_path)
+                os.makedirs(dest_dir, exist_ok=True)
+            else:
+                dest_dir = destination_path
+                
+            dest_file = os.path.join(dest_dir, new_filename)
+            
+            # Show byte progress for files big enough to take several chunks (mostly videos)
+            file_size = os.path.getsize(original_file)
+            file_copied = [0]
+            
+            def show_bytes(written, f=original_filename, n=processed, size=file_size):
+                file_copied[0] += written
+                if size <= COPY_CHUNK_SIZE:
+                    return
+                progress = ((n - 1 + file_copied[0] / size) / len(assets)) * 100
+                status = f"Processing: {f} ({self.format_size(file_copied[0])} of {self.format_size(size)})"
+                self.root.after(0, lambda: self.progress_var.set(progress))
+                self.root.after(0, lambda: self.status_var.set(status))
+                
+            # Copy original file
+            started = time.monotonic()
+            try:
+                self.stream_copy(original_file, dest_file, control, show_bytes)
+                successful += 1
+                
+                # Generate XMP if requested
+                if self.include_xmp.get():
+                    # Get keywords exactly like working version
+                    keywords = self.get_asset_keywords(uuid, conn)
+                    self.generate_xmp_file(dest_file, asset, keywords, conn, library=library_path)
+                    
+            except CopyCancelled:
+                self.record_asset(library_path, uuid, original_filename, "cancelled", started=started)
+                cancelled = True
+                break
+            except Exception as e:
+                print(f"Error copying {original_filename}: {e}")
+                self.record_asset(library_path, uuid, original_filename, "failed", started=started, error=e)
+                continue
+                
+            self.record_asset(library_path, uuid, original_filename, "copied", file_size, started)
+                
+        conn.close()
+        
+        note = ""
+        if self.telemetry:
+            self.telemetry.finish("cancelled" if cancelled else "completed")
+            if self.telemetry.error:
+                note = f"\n\nTelemetry not written: {self.telemetry.error}"
+            
+        # Show completion message
+        if cancelled:
+            self.root.after(0, lambda: messagebox.showinfo(
+                "Extraction Cancelled",
+                f"Cancelled after extracting {successful} out of {total_assets} photos{note}"
+            ))
+            return
+            
+        self.root.after(0, lambda: messagebox.showinfo(
+            "Extraction Complete", 
+            f"Successfully extracted {successful} out of {total_assets} photos{note}"
+        ))
+        
+class CopyClaim:
+    """An original claimed for copying by a batch worker, for other workers to deduplicate against"""
+    
+    def __init__(self, dest_file, digest=None):
+        self.dest_file = dest_file
+        self.digest = digest
+        self.copied = False
+        self.done = threading.Event()
+        
+    def finish(self, copied):
+        self.copied = copied
+        self.done.set()
+        
+class BatchExtractor(PhotoLibraryExtractor):
+    """Extract several Photos Libraries through one shared worker pool"""
+    
+    def __init__(self, libraries, workers=None, dedupe=False, progress_callback=None, control=None, telemetry=None):
+        self.libraries = libraries
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self.dedupe = dedupe
+        self.progress_callback = progress_callback
+        self.control = control or CopyControl()
+        self.telemetry = telemetry
+        self.bytes_copied = 0
+        
+        # Each worker thread opens its own connection per library for keyword lookups
+        self.local = threading.local()
+        self.open_connections = []
+        self.lock = threading.Lock()
+        
+        # Claims for deduplication by file size, in the order workers made them;
+        # an original is only hashed once another of the same size shows up
+        self.claims_by_size = {}
+        
+    def run(self):
+        """Extract every library and return the combined report"""
+        started = datetime.now()
+        reports = []
+        streams = deque()
+        
+        # Planning connections are closed here too, since a generator that never
+        # started (e.g. after a cancel) never runs its own cleanup
+        plan_connections = []
+        
+        try:
+            for job in self.libraries:
+                report = {
+                    "library": job["library"],
+                    "destination": job["destination"],
+                    "total": 0,
+                    "copied": 0,
+                    "bytes": 0,
+                    "duplicates": 0,
+                    "missing": 0,
+                    "no_date": 0,
+                    "failed": 0,
+                    "cancelled": 0,
+                    "duplicate_files": [],
+                    "errors": []
+                }
+                reports.append(report)
+                
+                error = self.check_library_paths(job["library"], job["destination"])
+                if error:
+                    report["errors"].append(error[1])
+                    if self.telemetry:
+                        self.telemetry.record_library_error(job["library"], error[1])
+                    continue
+                
+                try:
+                    conn = sqlite3.connect(os.path.join(job["library"], "database", "Photos.sqlite"))
+                    plan_connections.append(conn)
+                    streams.append(self.plan_library(job, report, conn))
+                except sqlite3.Error as e:
+                    report["errors"].append(f"Could not read Photos.sqlite: {e}")
+                    if self.telemetry:
+                        self.telemetry.record_library_error(job["library"], str(e))
+            
+            total = sum(report["total"] for report in reports)
+            completed = 0
+            current = ""
+            in_flight = {}
+
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                while streams or in_flight:
+                    # Stop handing out work once cancelled; in-flight copies bail at their next chunk
+                    if self.control.cancelled.is_set():
+                        streams.clear()
+                        
+                    # Top up the pool round-robin so a large library can't starve the others
+                    while streams and len(in_flight) < self.workers * 2:
+                        stream = streams.popleft()
+                        task = next(stream, None)
+                        if task is None:
+                            continue
+                        streams.append(stream)
+                        job, report, asset = task
+                        in_flight[pool.submit(self.process_asset, job, asset)] = task
+                        
+                    if not in_flight:
+                        continue
+                        
+                    # Wake up regularly so byte progress keeps moving during long video copies
+                    done, _ = wait(in_flight, timeout=1, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job, report, asset = in_flight.pop(future)
+                        current = asset[3] or asset[1]
+                        self.record_result(report, asset, future)
+                        
+                        # Cancelled copies didn't happen, so they don't count toward progress
+                        if not isinstance(future.exception(), CopyCancelled):
+                            completed += 1
+                        
+                    if self.progress_callback:
+                        # Assets skipped for having no date count as done so progress reaches 100%
+                        skipped = sum(report["no_date"] for report in reports)
+                        self.progress_callback(completed + skipped, total, current, self.bytes_copied)
+        except BaseException:
+            if self.telemetry:
+                self.telemetry.finish("failed")
+            raise
+        finally:
+            for conn in plan_connections + self.open_connections:
+                conn.close()
+                
+        if self.telemetry:
+            self.telemetry.finish("cancelled" if self.control.cancelled.is_set() else "completed")
+                
+        totals = {}
+        for key in ("total", "copied", "bytes", "duplicates", "missing", "no_date", "failed", "cancelled"):
+            totals[key] = sum(report[key] for report in reports)
+            
+        result = {
+            "started": started.isoformat(timespec="seconds"),
+            "elapsed_seconds": round((datetime.now() - started).total_seconds(), 2),
+            "workers": self.workers,
+            "dedupe": self.dedupe,
+            "cancelled": self.control.cancelled.is_set(),
+            "totals": totals,
+            "libraries": reports
+        }
+        if self.telemetry and self.telemetry.error:
+            result["telemetry_error"] = self.telemetry.error
+        return result
+        
+    def plan_library(self, job, report, conn):
+        """Yield (job, report, asset) tasks for one library, streaming from its database"""
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT COUNT(*) FROM ZASSET WHERE ZTRASHEDSTATE = 0")
+        total_assets = cursor.fetchone()[0]
+        
+        # Limit to first 20 files in test mode
+        limit = 20 if job["test_mode"] else None
+        report["total"] = min(total_assets, limit) if limit else total_assets
+        
+        def tasks():
+            cursor.execute(ASSET_QUERY)
+            for index, asset in enumerate(cursor):
+                if limit and index >= limit:
+                    break
+                    
+                # Assets without a creation date are skipped like in the GUI
+                if not asset[4]:
+                    report["no_date"] += 1
+                    self.record_asset(job["library"], asset[0], asset[3] or asset[1], "no_date")
+                    continue
+                    
+                yield job, report, asset
+                
+        return tasks()
+        
+    def process_asset(self, job, asset):
+        """Run copy_asset and report its outcome to telemetry; runs on a worker thread"""
+        started = time.monotonic()
+        name = asset[3] or asset[1]
+        try:
+            status, path = self.copy_asset(job, asset)
+        except CopyCancelled:
+            self.record_asset(job["library"], asset[0], name, "cancelled", started=started)
+            raise
+        except Exception as e:
+            self.record_asset(job["library"], asset[0], name, "failed", started=started, error=e)
+            raise
+            
+        num_bytes = os.path.getsize(path) if status == "copied" else 0
+        self.record_asset(job["library"], asset[0], name, status, num_bytes, started)
+        return status, path
+        
+    def copy_asset(self, job, asset):
+        """Copy one original (and its XMP sidecar)"""
+        self.control.checkpoint()
+        uuid, filename, directory, original_filename, date_created = asset[:5]
+        
+        # Use original filename if available, otherwise use filename
+        if not original_filename:
+            original_filename = filename
+            
+        creation_date = datetime.fromtimestamp(date_created + 978307200)
+        
+        # Find original file using directory path from database
+        original_file = os.path.join(job["library"], "originals", directory, filename)
+        if not os.path.exists(original_file):
+            return "missing", original_file
+            
+        # Generate destination paths
+        folder_path = self.get_folder_path(creation_date, job["folder_structure"])
+        new_filename = self.get_filename(original_filename, creation_date, job["filename_format"])
+        dest_dir = os.path.join(job["destination"], folder_path) if folder_path else job["destination"]
+        os.makedirs(dest_dir, exist_ok=True)
+        dest_file = os.path.join(dest_dir, new_filename)
+        
+        claim = None
+        if self.dedupe:
+            duplicate_of, claim = self.find_duplicate(original_file, dest_file)
+            if duplicate_of:
+                # Keep this library's keywords and people: the sidecar goes where the
+                # duplicate would have been written, with GPS read from its own original
+                if job["include_xmp"]:
+                    conn = self.get_connection(job["library"])
+                    keywords = self.get_asset_keywords(uuid, conn)
+                    self.generate_xmp_file(dest_file, asset, keywords, conn, exif_path=original_file, library=job["library"])
+                return "duplicate", duplicate_of
+                
+        try:
+            self.stream_copy(original_file, dest_file, self.control, self.count_bytes)
+        except Exception:
+            if claim:
+                claim.finish(False)
+            raise
+            
+        if claim:
+            claim.finish(True)
+            
+        # Generate XMP if requested
+        if job["include_xmp"]:
+            conn = self.get_connection(job["library"])
+            keywords = self.get_asset_keywords(uuid, conn)
+            self.generate_xmp_file(dest_file, asset, keywords, conn, library=job["library"])
+            
+        return "copied", dest_file
+        
+    def record_result(self, report, asset, future):
+        """Fold a finished task into its library report"""
+        name = asset[3] or asset[1]
+        try:
+            status, path = future.result()
+        except CopyCancelled:
+            report["cancelled"] += 1
+            return
+        except Exception as e:
+            report["failed"] += 1
+            report["errors"].append(f"Error copying {name}: {e}")
+            return
+            
+        if status == "copied":
+            report["copied"] += 1
+            report["bytes"] += os.path.getsize(path)
+        elif status == "duplicate":
+            report["duplicates"] += 1
+            report["duplicate_files"].append({"file": name, "duplicate_of": path})
+        else:
+            report["missing"] += 1
+            
+    def count_bytes(self, written):
+        with self.lock:
+            self.bytes_copied += written
+            
+    def get_connection(self, library_path):
+        """Return this thread's connection to a library database"""
+        connections = getattr(self.local, "connections", None)
+        if connections is None:
+            connections = self.local.connections = {}
+            
+        if library_path not in connections:
+            db_path = os.path.join(library_path, "database", "Photos.sqlite")
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            connections[library_path] = conn
+            with self.lock:
+                self.open_connections.append(conn)
+                
+        return connections[library_path]
+        
+    def find_duplicate(self, original_file, dest_file):
+        """Return (destination of an identical original that was copied, None) or (None, claim for this copy)"""
+        size = os.path.getsize(original_file)
+        
+        # Only earlier claims are compared against, so workers never wait on each other in a cycle
+        with self.lock:
+            earlier = list(self.claims_by_size.get(size, []))
+            claim = CopyClaim(dest_file)
+            self.claims_by_size.setdefault(size, []).append(claim)
+            
+        try:
+            if earlier:
+                claim.digest = self.file_digest(original_file)
+                
+            for other in earlier:
+                # Wait for the earlier copy so nothing is skipped in favour of a copy that then fails
+                other.done.wait()
+                if not other.copied:
+                    continue
+                    
+                if other.digest is None:
+                    try:
+                        other.digest = self.file_digest(other.dest_file)
+                    except OSError:
+                        continue
+                        
+                if other.digest == claim.digest:
+                    claim.finish(False)
+                    return other.dest_file, None
+        except BaseException:
+            claim.finish(False)
+            raise
+            
+        return None, claim
+        
+class ManifestExporter(PhotoLibraryExtractor):
+    """Stream a library's joined metadata into a CSV, JSONL or SQLite manifest without copying anything"""
+    
+    def __init__(self, library_path, output_path, manifest_format=None, include_hash=False, include_exif_gps=False, control=None, progress_callback=None):
+        self.library_path = library_path
+        self.output_path = output_path
+        self.manifest_format = manifest_format or MANIFEST_FORMATS.get(os.path.splitext(output_path)[1].lower())
+        if self.manifest_format not in ("csv", "jsonl", "sqlite"):
+            raise ValueError(f"Can't tell the manifest format from {output_path}; use .csv, .jsonl or .sqlite")
+            
+        # Both of these read the original files, so they're opt-in
+        self.include_hash = include_hash
+        self.include_exif_gps = include_exif_gps
+        self.control = control or CopyControl()
+        self.progress_callback = progress_callback
+        
+    def run(self):
+        """Write the manifest and return the number of assets in it"""
+        output_dir = os.path.dirname(os.path.abspath(self.output_path))
+        fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.output_path)}.", suffix=".partial", dir=output_dir)
+        os.close(fd)
+        
+        conn = None
+        try:
+            # Read-only, so closing the connection can't checkpoint a WAL into the library
+            db_path = os.path.abspath(os.path.join(self.library_path, "database", "Photos.sqlite"))
+            conn = sqlite3.connect(f"{Path(db_path).as_uri()}?mode=ro", uri=True)
+            rows = self.iter_rows(conn)
+            if self.manifest_format == "csv":
+                count = self.write_csv(rows, temp_path)
+            elif self.manifest_format == "jsonl":
+                count = self.write_jsonl(rows, temp_path)
+            else:
+                count = self.write_sqlite(rows, temp_path)
+                
+            # mkstemp creates the file owner-only; indexers often run as another user
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.output_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        finally:
+            if conn:
+                conn.close()
+                
+        return count
+        
+    def load_tags(self, conn):
+        """Keywords and person names for every asset, keyed by UUID, in two queries instead of two per asset"""
+        keyword_query = """
+        SELECT a.ZUUID, k.ZTITLE
+        FROM ZASSET a 
+        JOIN ZADDITIONALASSETATTRIBUTES aaa ON a.ZADDITIONALATTRIBUTES = aaa.Z_PK 
+        JOIN Z_1KEYWORDS z1k ON aaa.Z_PK = z1k.Z_1ASSETATTRIBUTES 
+        JOIN ZKEYWORD k ON z1k.Z_51KEYWORDS = k.Z_PK 
+        WHERE a.ZTRASHEDSTATE = 0 AND k.ZTITLE IS NOT NULL
+        """
+        
+        person_query = """
+        SELECT DISTINCT a.ZUUID, p.ZDISPLAYNAME
+        FROM ZASSET a 
+        JOIN ZDETECTEDFACE df ON a.Z_PK = df.ZASSETFORFACE
+        JOIN ZPERSON p ON df.ZPERSONFORFACE = p.Z_PK
+        WHERE a.ZTRASHEDSTATE = 0 AND p.ZDISPLAYNAME IS NOT NULL AND p.ZDISPLAYNAME != ''
+        """
+        
+        keywords = {}
+        for uuid, title in conn.execute(keyword_query):
+            keywords.setdefault(uuid, []).append(title)
+            
+        people = {}
+        for uuid, name in conn.execute(person_query):
+            people.setdefault(uuid, []).append(name)
+            
+        return keywords, people
+        
+    def iter_rows(self, conn):
+        """Yield one manifest row per asset, streaming from the asset query"""
+        keywords, people = self.load_tags(conn)
+        total = conn.execute("SELECT COUNT(*) FROM ZASSET WHERE ZTRASHEDSTATE = 0").fetchone()[0]
+        originals_path = os.path.join(self.library_path, "originals")
+        
+        # Hashing and exiftool are I/O bound, so spread them over a pool while rows stream in order
+        pool = ThreadPoolExecutor() if self.include_hash or self.include_exif_gps else None
+        cursor = conn.execute(ASSET_QUERY)
+        processed = 0
+        
+        try:
+            while True:
+                assets = cursor.fetchmany(256)
+                if not assets:
+                    break
+                    
+                self.control.checkpoint()
+                rows = [self.asset_row(asset, keywords, people) for asset in assets]
+                
+                if pool:
+                    paths = [os.path.join(originals_path, asset[2] or "", asset[1] or "") for asset in assets]
+                    for row, extra in zip(rows, pool.map(self.read_original, paths)):
+                        row.update(extra)
+                        
+                for row in rows:
+                    yield row
+                    
+                processed += len(rows)
+                if self.progress_callback:
+                    self.progress_callback(processed, total)
+        finally:
+            if pool:
+                pool.shutdown()
+                
+    def asset_row(self, asset, keywords, people):
+        """Flatten one asset query row the way create_xmp_sidecar interprets it"""
+        uuid, filename, directory, original_filename, date_created, lat, lon, make, model, focal_length, aperture, iso, shutter_speed, flash_fired, ext_lat, ext_lon, timezone_offset, timezone_name = asset
+        
+        # Use extended attributes coordinates if available (higher precision)
+        if ext_lat is not None and ext_lon is not None:
+            lat, lon = ext_lat, ext_lon
+        if lat == -180.0 or lon == -180.0:
+            lat, lon = None, None
+            
+        # Dates carry the offset they were taken in when the library knows it, otherwise UTC
+        date_iso = None
+        if date_created:
+            try:
+                tz = dt_timezone(timedelta(seconds=int(timezone_offset))) if timezone_offset is not None else dt_timezone.utc
+            except (ValueError, TypeError):
+                tz = dt_timezone.utc
+            date_iso = datetime.fromtimestamp(date_created + 978307200, tz).isoformat()
+            
+        return {
+            "uuid": uuid,
+            "original_filename": original_filename or filename,
+            "original_path": os.path.join(directory, filename) if directory and filename else filename,
+            "date_created": date_iso,
+            "timezone_name": timezone_name,
+            "timezone_offset": timezone_offset,
+            "latitude": lat,
+            "longitude": lon,
+            "camera_make": make,
+            "camera_model": model,
+            "focal_length": focal_length,
+            "aperture": aperture,
+            "iso": iso,
+            "shutter_speed": shutter_speed,
+            "flash_fired": flash_fired,
+            "keywords": keywords.get(uuid, []),
+            "people": people.get(uuid, [])
+        }
+        
+    def read_original(self, original_file):
+        """Hash and/or EXIF GPS fields for one original, blank if it isn't on disk"""
+        extra = {}
+        exists = os.path.exists(original_file)
+        if self.include_hash:
+            extra["sha256"] = self.file_digest(original_file) if exists else None
+        if self.include_exif_gps:
+            gps = self.read_gps_exif(original_file) if exists else {}
+            for field in MANIFEST_GPS_FIELDS:
+                extra[field] = gps.get(field)
+        return extra
+        
+    def columns(self):
+        columns = list(MANIFEST_COLUMNS)
+        if self.include_hash:
+            columns.append("sha256")
+        if self.include_exif_gps:
+            columns.extend(MANIFEST_GPS_FIELDS)
+        return columns
+        
+    def write_csv(self, rows, path):
+        count = 0
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns())
+            writer.writeheader()
+            for row in rows:
+                # Keep one asset per line; tags are joined since CSV has no lists
+                row["keywords"] = "; ".join(row["keywords"])
+                row["people"] = "; ".join(row["people"])
+                writer.writerow(row)
+                count += 1
+        return count
+        
+    def write_jsonl(self, rows, path):
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+        
+    def write_sqlite(self, rows, path):
+        columns = [column for column in self.columns() if column not in ("keywords", "people")]
+        out = sqlite3.connect(path)
+        try:
+            out.execute(f"CREATE TABLE assets ({', '.join(columns)}, PRIMARY KEY (uuid))")
+            out.execute("CREATE TABLE asset_keywords (uuid, keyword)")
+            out.execute("CREATE TABLE asset_people (uuid, name)")
+            
+            insert_asset = f"INSERT OR REPLACE INTO assets VALUES ({', '.join('?' for _ in columns)})"
+            count = 0
+            for row in rows:
+                out.execute(insert_asset, [row[column] for column in columns])
+                out.executemany("INSERT INTO asset_keywords VALUES (?, ?)", [(row["uuid"], keyword) for keyword in row["keywords"]])
+                out.executemany("INSERT INTO asset_people VALUES (?, ?)", [(row["uuid"], name) for name in row["people"]])
+                count += 1
+                
+            out.execute("CREATE INDEX asset_keywords_keyword ON asset_keywords (keyword)")
+            out.execute("CREATE INDEX asset_people_name ON asset_people (name)")
+            out.commit()
+        finally:
+            out.close()
+        return count
+        
+def load_batch_job(job_path):
+    """Read a batch job file and fill in per-library defaults"""
+    with open(job_path, 'r', encoding='utf-8') as f:
+        job = json.load(f)
+        
+    if not isinstance(job, dict):
+        raise ValueError(f"{job_path} must contain a JSON object with a 'libraries' list")
+        
+    libraries = job.get("libraries")
+    if not libraries or not isinstance(libraries, list):
+        raise ValueError(f"{job_path} does not list any libraries")
+        
+    for entry in libraries:
+        if not isinstance(entry, dict) or not entry.get("library") or not entry.get("destination"):
+            raise ValueError("Every library entry needs a 'library' and a 'destination'")
+        for key, value in BATCH_DEFAULTS.items():
+            entry.setdefault(key, value)
+            
+    return job
+    
+def format_batch_summary(report):
+    """One line per library plus the totals, for the completion dialog and the CLI"""
+    lines = []
+    for library in report["libraries"]:
+        line = f"{library['library']}: {library['copied']} of {library['total']} extracted"
+        if library["duplicates"]:
+            line += f", {library['duplicates']} duplicates"
+        if library["missing"]:
+            line += f", {library['missing']} missing"
+        if library["failed"] or library["errors"]:
+            line += f", {len(library['errors'])} errors"
+        lines.append(line)
+        
+    totals = report["totals"]
+    if report["cancelled"]:
+        lines.append("Cancelled before all libraries finished")
+    lines.append(f"Total: {totals['copied']} of {totals['total']} extracted in {report['elapsed_seconds']}s")
+    if report.get("telemetry_error"):
+        lines.append(f"Telemetry not written: {report['telemetry_error']}")
+    return "\n".join(lines)
+    
+def run_batch(args):
+    """Run a batch job file from the command line"""
+    try:
+        job = load_batch_job(args.batch)
+    except (OSError, ValueError) as e:
+        print(f"Invalid batch job: {e}", file=sys.stderr)
+        return 2
+        
+    control = CopyControl()
+    last_shown = [-1, 0]
+    
+    def show_progress(completed, total, name, bytes_copied):
+        # Print on every new percent, or every 10 seconds while a large file is copying
+        percent = int(completed * 100 / total) if total else 100
+        if control.is_paused() or (percent == last_shown[0] and time.time() - last_shown[1] < 10):
+            return
+        last_shown[0], last_shown[1] = percent, time.time()
+        print(f"[{percent:3d}%] {completed}/{total} {extractor.format_size(bytes_copied)} {name}", file=sys.stderr)
+        
+    def handle_signal(signum, frame):
+        if signum == signal.SIGINT:
+            print("Cancelling, removing partial files...", file=sys.stderr)
+            control.cancel()
+        elif signum == signal.SIGUSR1:
+            print(f"Paused, send SIGUSR2 to {os.getpid()} to resume", file=sys.stderr)
+            control.pause()
+        else:
+            print("Resuming", file=sys.stderr)
+            control.resume()
+            
+    # Ctrl-C cancels cleanly; SIGUSR1/SIGUSR2 pause and resume where available
+    signal.signal(signal.SIGINT, handle_signal)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, handle_signal)
+        signal.signal(signal.SIGUSR2, handle_signal)
+        
+    events_log = args.events_log or job.get("events_log")
+    metrics_file = args.metrics_file or job.get("metrics_file")
+    try:
+        telemetry = RunTelemetry("batch", events_log, metrics_file) if events_log or metrics_file else None
+    except OSError as e:
+        print(f"Can't write telemetry: {e}", file=sys.stderr)
+        return 2
+        
+    extractor = BatchExtractor(
+        job["libraries"],
+        workers=args.workers or job.get("workers"),
+        dedupe=args.dedupe or job.get("dedupe", False),
+        progress_callback=show_progress,
+        control=control,
+        telemetry=telemetry
+    )
+    report = extractor.run()
+    
+    report_path = args.report or job.get("report")
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            
+    print(format_batch_summary(report))
+    if report["cancelled"]:
+        return 130
+    if any(library["errors"] for library in report["libraries"]):
+        return 1
+    return 3 if report.get("telemetry_error") else 0
+    
+def run_manifest(args):
+    """Export a metadata manifest from the command line"""
+    if not args.library:
+        print("--manifest needs --library", file=sys.stderr)
+        return 2
+        
+    extractor = PhotoLibraryExtractor()
+    error = extractor.check_library_paths(args.library, os.path.dirname(os.path.abspath(args.manifest)))
+    if error:
+        print(error[1], file=sys.stderr)
+        return 2
+        
+    control = CopyControl()
+    signal.signal(signal.SIGINT, lambda signum, frame: control.cancel())
+    
+    try:
+        exporter = ManifestExporter(
+            args.library,
+            args.manifest,
+            manifest_format=args.manifest_format,
+            include_hash=args.hash,
+            include_exif_gps=args.exif_gps,
+            control=control
+        )
+        started = time.time()
+        count = exporter.run()
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    except sqlite3.Error as e:
+        print(f"Could not read Photos.sqlite: {e}", file=sys.stderr)
+        return 2
+    except OSError as e:
+        print(f"Could not write manifest: {e}", file=sys.stderr)
+        return 2
+    except CopyCancelled:
+        print("Cancelled", file=sys.stderr)
+        return 130
+        
+    print(f"Wrote metadata for {count} assets to {args.manifest} in {time.time() - started:.1f}s")
+    return 0
+    
+def main():
+    parser = argparse.ArgumentParser(description="Extract photos and videos from Apple Photos Libraries")
+    parser.add_argument("--batch", metavar="JOB_FILE", help="run a JSON batch job without opening the GUI")
+    parser.add_argument("--workers", type=int, help="size of the shared worker pool for batch mode")
+    parser.add_argument("--dedupe", action="store_true", help="skip originals identical to one already extracted")
+    parser.add_argument("--report", metavar="PATH", help="write the combined batch report as JSON")
+    parser.add_argument("--manifest", metavar="OUTPUT", help="export a metadata manifest (.csv, .jsonl or .sqlite) without copying")
+    parser.add_argument("--library", metavar="PATH", help="Photos Library to read for --manifest")
+    parser.add_argument("--manifest-format", choices=["csv", "jsonl", "sqlite"], help="manifest format if not given by the extension")
+    parser.add_argument("--hash", action="store_true", help="add a SHA-256 of each original to the manifest (reads every original)")
+    parser.add_argument("--exif-gps", action="store_true", help="add the EXIF GPS fields used in XMP sidecars (runs exiftool on every original)")
+    parser.add_argument("--events-log", metavar="PATH", help="append a JSON-lines event per asset and per run")
+    parser.add_argument("--metrics-file", metavar="PATH", help="write Prometheus textfile metrics at the end of each run")
+    args = parser.parse_args()
+    
+    if args.batch:
+        sys.exit(run_batch(args))
+        
+    if args.manifest:
+        sys.exit(run_manifest(args))
+        
     root = tk.Tk()
-    app = PhotoExtractGUI(root)
+    app = PhotoExtractGUI(root, events_log=args.events_log, metrics_file=args.metrics_file)
     root.mainloop()
 
 if __name__ == "__main__":